@@ -2,50 +2,168 @@
 """
 根据 projects 目录自动生成 ProjectLab 的项目索引，
 更新 README.md 中 <!-- project_index:start --> ... <!-- project_index:end --> 之间的内容。
+
+增量构建：
+- .index_manifest.json 记录每个项目 README 的 (mtime, size, title)，未变化的项目不再读文件
+- 变化的 README 只读取开头若干字节取第一行标题
+- 各项目目录并行 stat，不遍历 notes.assets/ 等子目录
+- 索引文本未变化时不写 README.md
+- 顺带增量更新全文检索索引 .search_index.json（见 note_search.py）
+
+用法：
+    python build_index.py            # 更新一次
+    python build_index.py --watch    # 持续监视 projects/，有变化即更新
+    python note_search.py 关键词      # 检索全部笔记
 """
 
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
+
+import note_search
 
 ROOT = Path(__file__).resolve().parent
 PROJECTS_DIR = ROOT / "projects"
 README = ROOT / "README.md"
+MANIFEST = ROOT / ".index_manifest.json"
+
+START = "<!-- project_index:start -->"
+END = "<!-- project_index:end -->"
+
+HEADER_CHUNK = 1024          # 每次读取的字节数
+HEADER_LIMIT = 64 * 1024     # 第一行超过这个长度就截断
+MANIFEST_VERSION = 1
+
+
+def read_title(readme: Path) -> Optional[str]:
+    """只读 README 开头直到第一个换行，返回去掉 # 的标题；空文件返回 None"""
+    head = b""
+    with readme.open("rb") as f:
+        while len(head) < HEADER_LIMIT:
+            chunk = f.read(HEADER_CHUNK)
+            if not chunk:
+                break
+            head += chunk
+            if b"\n" in chunk:
+                break
+    if not head:
+        return None
+    first_line = head.split(b"\n", 1)[0]
+    # 截断处可能切在多字节字符中间
+    title_line = first_line.decode("utf-8-sig", errors="ignore").rstrip("\r")
+    return title_line.lstrip("#").strip()
+
+
+def load_manifest() -> dict:
+    try:
+        data = json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("projects", {})
+
+
+def save_manifest(projects: dict):
+    payload = {"version": MANIFEST_VERSION, "projects": projects}
+    tmp = MANIFEST.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, MANIFEST)
+
 
-def build_index_text() -> str:
+def _scan_one(name: str, cached: Optional[dict]) -> Optional[dict]:
+    readme = PROJECTS_DIR / name / "README.md"
+    try:
+        st = readme.stat()
+    except OSError:
+        return None
+    if cached and cached.get("mtime_ns") == st.st_mtime_ns and cached.get("size") == st.st_size:
+        return cached
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "title": read_title(readme)}
+
+
+def scan_projects(manifest: dict) -> dict:
+    """返回新的 manifest：{项目目录名: {mtime_ns, size, title}}"""
+    if not PROJECTS_DIR.exists():
+        return {}
+    names = sorted(e.name for e in os.scandir(PROJECTS_DIR) if e.is_dir())
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+        entries = pool.map(lambda n: _scan_one(n, manifest.get(n)), names)
+        return {n: e for n, e in zip(names, entries) if e is not None}
+
+
+def build_index_text(projects: Optional[dict] = None) -> str:
+    if projects is None:
+        projects = scan_projects(load_manifest())
     items = []
-    if PROJECTS_DIR.exists():
-        for folder in sorted(PROJECTS_DIR.iterdir()):
-            if folder.is_dir():
-                readme = folder / "README.md"
-                if not readme.exists():
-                    continue
-                lines = readme.read_text(encoding="utf-8").splitlines()
-                if not lines:
-                    continue
-                # 取第一行标题作为显示名称
-                title_line = lines[0]
-                title = title_line.lstrip("#").strip()
-                rel_path = readme.relative_to(ROOT).as_posix()
-                items.append(f"- [{title}]({rel_path})")
+    for name in sorted(projects):
+        # 取第一行标题作为显示名称
+        title = projects[name]["title"]
+        if title is None:
+            continue
+        rel_path = (PROJECTS_DIR / name / "README.md").relative_to(ROOT).as_posix()
+        items.append(f"- [{title}]({rel_path})")
     if not items:
         return "_暂时没有项目_"
     return "\n".join(items)
 
-def main():
-    text = README.read_text(encoding="utf-8")
-    start = "<!-- project_index:start -->"
-    end = "<!-- project_index:end -->"
 
-    if start not in text or end not in text:
+def update_once() -> bool:
+    """增量更新项目索引与全文检索索引；README.md 有写入时返回 True"""
+    text = README.read_text(encoding="utf-8")
+    if START not in text or END not in text:
         raise RuntimeError("README.md 中缺少 project_index 标记")
 
-    before, _, rest = text.partition(start)
-    _, _, after = rest.partition(end)
+    manifest = load_manifest()
+    projects = scan_projects(manifest)
+    if projects != manifest:
+        save_manifest(projects)
+
+    before, _, rest = text.partition(START)
+    _, _, after = rest.partition(END)
+    new_text = before + START + "\n" + build_index_text(projects) + "\n" + END + after
+
+    written = new_text != text
+    if written:
+        README.write_text(new_text, encoding="utf-8")
+    note_search.update_index()
+    return written
+
+
+def watch(interval: float):
+    """轮询 README 与笔记的 stat，变化时增量更新；Ctrl+C 退出"""
+    print(f"监视 {PROJECTS_DIR} 中（每 {interval:g} 秒），Ctrl+C 退出。")
+    try:
+        while True:
+            try:
+                if update_once():
+                    print(time.strftime("%H:%M:%S"), "项目索引已更新。")
+            except OSError as e:
+                # README 被编辑器占用、笔记刚被移走等：报告后继续轮询，下一轮再试
+                print(time.strftime("%H:%M:%S"), f"本轮更新失败，稍后重试：{e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="更新 ProjectLab 项目索引")
+    parser.add_argument("--watch", action="store_true", help="持续监视 projects/ 并自动更新")
+    parser.add_argument("--interval", type=float, default=1.0, help="监视模式的轮询间隔（秒）")
+    args = parser.parse_args(argv)
 
-    index_text = build_index_text()
-    new_text = before + start + "\n" + index_text + "\n" + end + after
+    if args.watch:
+        watch(args.interval)
+        return
+    if update_once():
+        print("项目索引已更新。")
+    else:
+        print("项目索引无变化。")
 
-    README.write_text(new_text, encoding="utf-8")
-    print("项目索引已更新。")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+ProjectLab 各 Streamlit 应用共用的耗时统计。
+
+Streamlit 每次交互都会把脚本从头执行一遍（一次 rerun）。本模块：
+- 在 rerun 内按阶段（load / compute / render ...）计时，另记整次 rerun 的 total
+- 耗时写入 logs/perf/<app>.json：每小时一个窗口的对数分桶直方图，保留最近 7 天
+- 设置环境变量 LAB_PERF_PROFILE=1 时对每次 rerun 开启 cProfile，
+  只有超过 LAB_PERF_SLOW_MS（默认 1500ms）的 rerun 才把 .prof 存到 logs/perf/profiles/
+- perf_dashboard.py 读取这些文件，展示各阶段 p50 / p99
+
+用法（把整页脚本包在 rerun 里，异常、st.stop 与 rerun 中断时也会结束计时）：
+    with lab_perf.rerun("pr_screener"):
+        with lab_perf.span("load"):
+            ...
+有 main() 的脚本可直接 `with lab_perf.rerun("lit_manager"): main()`。
+"""
+
+import cProfile
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+PERF_DIR = ROOT / "logs" / "perf"
+PROFILE_DIR = PERF_DIR / "profiles"
+
+PROFILE = os.environ.get("LAB_PERF_PROFILE") == "1"
+SLOW_MS = float(os.environ.get("LAB_PERF_SLOW_MS", "1500"))
+KEEP_PROFILES = 20            # 每个应用最多保留的 .prof 个数
+
+WINDOW_SECONDS = 3600
+KEEP_WINDOWS = 24 * 7
+# 0.5ms 起按 1.25 倍递增的桶上界（约到 55s），超出的另记一桶
+BUCKET_BOUNDS = [round(0.5 * 1.25 ** i, 3) for i in range(53)]
+
+
+def bucket_of(ms: float) -> int:
+    if ms <= BUCKET_BOUNDS[0]:
+        return 0
+    i = int(math.ceil(math.log(ms / BUCKET_BOUNDS[0], 1.25)))
+    return min(i, len(BUCKET_BOUNDS))
+
+
+def quantile(counts: dict, q: float) -> float:
+    """由分桶计数估计分位数，返回所在桶的上界 (ms)；无数据返回 nan"""
+    total = sum(counts.values())
+    if not total:
+        return float("nan")
+    need = q * total
+    acc = 0
+    for b in sorted(counts, key=int):
+        acc += counts[b]
+        if acc >= need:
+            b = int(b)
+            return BUCKET_BOUNDS[b] if b < len(BUCKET_BOUNDS) else float("inf")
+    return float("inf")
+
+
+# ------- 持久化 -------
+class _Histogram:
+    """单个应用的滚动直方图：windows = [{start, stages: {stage: {bucket: count}}}]"""
+
+    def __init__(self, app: str):
+        self.app = app
+        self.path = PERF_DIR / f"{app}.json"
+        self.lock = threading.Lock()
+        self.windows = self._load()
+
+    def _load(self) -> list:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return []
+        if data.get("bounds") != BUCKET_BOUNDS:
+            return []  # 分桶方式变了，旧数据不可比
+        return data.get("windows", [])
+
+    def add(self, samples: dict, now: float):
+        start = int(now // WINDOW_SECONDS * WINDOW_SECONDS)
+        with self.lock:
+            if not self.windows or self.windows[-1]["start"] != start:
+                self.windows.append({"start": start, "stages": {}})
+                del self.windows[:-KEEP_WINDOWS]
+            stages = self.windows[-1]["stages"]
+            for stage, ms_list in samples.items():
+                counts = stages.setdefault(stage, {})
+                for ms in ms_list:
+                    b = str(bucket_of(ms))
+                    counts[b] = counts.get(b, 0) + 1
+            payload = {"app": self.app, "bounds": BUCKET_BOUNDS, "windows": self.windows}
+            PERF_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+_histograms = {}
+_histograms_guard = threading.Lock()
+
+def _histogram(app: str) -> _Histogram:
+    with _histograms_guard:
+        if app not in _histograms:
+            _histograms[app] = _Histogram(app)
+        return _histograms[app]
+
+
+def load_summary(path: Path, since: float = 0) -> dict:
+    """读取一个应用的统计文件，合并 since 之后的窗口：{stage: {bucket: count}}"""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    merged = {}
+    for w in data.get("windows", []):
+        if w["start"] + WINDOW_SECONDS <= since:
+            continue
+        for stage, counts in w["stages"].items():
+            acc = merged.setdefault(stage, {})
+            for b, n in counts.items():
+                acc[b] = acc.get(b, 0) + n
+    return merged
+
+
+# ------- 计时 -------
+_local = threading.local()  # Streamlit 每个会话的脚本在各自线程里执行
+
+
+class Rerun:
+    """一次脚本执行：收集各阶段耗时，结束时写入直方图"""
+
+    def __init__(self, app: str):
+        self.app = app
+        self.samples = {}
+        self.t0 = time.perf_counter()
+        self.profiler = None
+        if PROFILE:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:  # 其他会话的 profiler 正在运行（3.12+ 全进程只能有一个）
+                self.profiler = None
+        _local.current = self
+
+    def record(self, stage: str, ms: float):
+        self.samples.setdefault(stage, []).append(ms)
+
+    def finish(self):
+        if getattr(_local, "current", None) is self:
+            _local.current = None
+        total = (time.perf_counter() - self.t0) * 1000
+        self.record("total", total)
+        if self.profiler is not None:
+            self.profiler.disable()
+            if total >= SLOW_MS:
+                self._dump_profile(total)
+            self.profiler = None
+        try:
+            _histogram(self.app).add(self.samples, time.time())
+        except OSError:
+            pass  # 统计写不进去不影响页面本身
+
+    def _dump_profile(self, total: float):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        name = f"{self.app}_{time.strftime('%Y%m%d_%H%M%S')}_{total:.0f}ms.prof"
+        self.profiler.dump_stats(str(PROFILE_DIR / name))
+        old = sorted(PROFILE_DIR.glob(f"{self.app}_*.prof"), key=lambda p: p.stat().st_mtime)
+        for p in old[:-KEEP_PROFILES]:
+            p.unlink(missing_ok=True)
+
+
+def begin(app: str) -> Rerun:
+    """手动开始一次 rerun，须保证 finish() 一定被调用（try/finally）；页面脚本优先用 rerun()"""
+    return Rerun(app)
+
+
+@contextmanager
+def rerun(app: str):
+    run = Rerun(app)
+    try:
+        yield run
+    finally:
+        run.finish()
+
+
+@contextmanager
+def span(stage: str):
+    """计时一个阶段；不在 rerun 内时什么也不记"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        run = getattr(_local, "current", None)
+        if run is not None:
+            run.record(stage, (time.perf_counter() - t0) * 1000)
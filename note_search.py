@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+ProjectLab 全文检索：对仓库内所有 Markdown 笔记维护倒排索引。
+
+- 按标题（# ~ ######）切分为小节，命中结果带 README.md#锚点 与行号
+- 中文按字与相邻二字切分，英文/数字按词切分并转小写
+- 索引保存在 .search_index.json，按文件 (mtime, size) 增量更新
+- BM25 排序，标题中的词加权；结果附带高亮摘要
+
+用法：
+    python note_search.py 市赚率 ROE
+    python note_search.py -n 5 "灵感 清单"
+build_index.py 每次运行时也会顺带更新本索引。
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+INDEX_FILE = ROOT / ".search_index.json"
+INDEX_VERSION = 1
+
+SKIP_DIRS = {"__pycache__", "node_modules", "venv"}
+HEADING_WEIGHT = 3            # 标题中的词按几次出现计
+BM25_K1, BM25_B = 1.2, 0.75
+SNIPPET_RADIUS = 36
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_TOKEN_RE = re.compile(r"[0-9a-z_]+|[㐀-䶿一-鿿豈-﫿]+")
+_SLUG_DROP_RE = re.compile(r"[^\w\- ]")
+
+
+# ------- 分词 -------
+def _is_cjk(run: str) -> bool:
+    return not run[0].isascii()
+
+def tokenize(text: str) -> list:
+    """建索引用：英文词 + 中文单字 + 中文相邻二字"""
+    out = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _is_cjk(run):
+            out.extend(run)
+            out.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            out.append(run)
+    return out
+
+def query_terms(query: str) -> list:
+    """查询用：多字中文只取二字，避免单字把结果冲淡"""
+    terms = []
+    for run in _TOKEN_RE.findall(query.lower()):
+        if _is_cjk(run) and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return list(dict.fromkeys(terms))
+
+
+# ------- 切分小节 -------
+def slugify(heading: str) -> str:
+    """与 GitHub 标题锚点一致：转小写、去标点、空格变连字符"""
+    return _SLUG_DROP_RE.sub("", heading.strip().lower()).replace(" ", "-")
+
+def split_sections(text: str) -> list:
+    """[{heading, anchor, line, text}]；第一个标题之前的内容作为锚点为空的小节"""
+    sections, seen = [], {}
+    cur = {"heading": "", "anchor": "", "line": 1, "lines": []}
+    in_fence = False
+    for no, line in enumerate(text.splitlines(), 1):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        m = None if in_fence else _HEADING_RE.match(line)
+        if m:
+            sections.append(cur)
+            heading = m.group(2).strip()
+            slug = slugify(heading)
+            n = seen.get(slug, 0)
+            seen[slug] = n + 1
+            cur = {"heading": heading, "anchor": slug if n == 0 else f"{slug}-{n}",
+                   "line": no, "lines": []}
+        cur["lines"].append(line)
+    sections.append(cur)
+    out = []
+    for s in sections:
+        body = "\n".join(s.pop("lines")).strip()
+        if body:
+            s["text"] = body
+            out.append(s)
+    return out
+
+def _section_tf(sec: dict) -> dict:
+    tf = {}
+    for t in tokenize(sec["text"]):
+        tf[t] = tf.get(t, 0) + 1
+    for t in tokenize(sec["heading"]):
+        tf[t] = tf.get(t, 0) + HEADING_WEIGHT - 1
+    return tf
+
+
+# ------- 索引 -------
+def iter_markdown(root: Path = ROOT):
+    """仓库内所有 .md，跳过隐藏目录与 *.assets 等资源目录"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames
+                             if not d.startswith(".") and not d.endswith(".assets") and d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            if name.lower().endswith(".md"):
+                yield Path(dirpath) / name
+
+def _empty_index() -> dict:
+    return {"version": INDEX_VERSION, "next_id": 0, "files": {}, "sections": {}, "postings": {}}
+
+def load_index() -> dict:
+    try:
+        idx = json.loads(INDEX_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return _empty_index()
+    return idx if idx.get("version") == INDEX_VERSION else _empty_index()
+
+def save_index(idx: dict):
+    tmp = INDEX_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(idx, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, INDEX_FILE)
+
+def _drop_file(idx: dict, rel: str):
+    postings = idx["postings"]
+    for sid in idx["files"].pop(rel)["sections"]:
+        sec = idx["sections"].pop(sid)
+        for t in _section_tf(sec):
+            plist = postings.get(t)
+            if plist is not None:
+                plist.pop(sid, None)
+                if not plist:
+                    del postings[t]
+
+def _add_file(idx: dict, rel: str, text: str, st):
+    sids = []
+    for sec in split_sections(text):
+        sid = str(idx["next_id"])
+        idx["next_id"] += 1
+        sec["file"] = rel
+        tf = _section_tf(sec)
+        sec["len"] = sum(tf.values())
+        idx["sections"][sid] = sec
+        for t, n in tf.items():
+            idx["postings"].setdefault(t, {})[sid] = n
+        sids.append(sid)
+    idx["files"][rel] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sections": sids}
+
+def update_index(idx: dict = None, save: bool = True):
+    """按 mtime/size 增量更新；返回 (索引, 变动文件数)"""
+    idx = idx or load_index()
+    present = {}
+    for path in iter_markdown():
+        present[path.relative_to(ROOT).as_posix()] = path
+    changed = 0
+    for rel in [r for r in idx["files"] if r not in present]:
+        _drop_file(idx, rel)
+        changed += 1
+    for rel, path in present.items():
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        old = idx["files"].get(rel)
+        if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+            continue
+        try:
+            text = path.read_text(encoding="utf-8-sig", errors="replace")
+        except OSError:
+            continue  # 刚被删除 / 改名或被编辑器占用：旧条目保留，下一轮再试
+        if old:
+            _drop_file(idx, rel)
+        _add_file(idx, rel, text, st)
+        changed += 1
+    if changed and save:
+        save_index(idx)
+    return idx, changed
+
+
+# ------- 查询 -------
+def search(idx: dict, query: str, limit: int = 10) -> list:
+    """BM25 排序，返回 [(score, section)]"""
+    terms = query_terms(query)
+    sections = idx["sections"]
+    n_docs = len(sections)
+    if not terms or not n_docs:
+        return []
+    avgdl = sum(s["len"] for s in sections.values()) / n_docs
+    scores = {}
+    for t in terms:
+        plist = idx["postings"].get(t)
+        if not plist:
+            continue
+        idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+        for sid, tf in plist.items():
+            dl = sections[sid]["len"]
+            s = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl))
+            scores[sid] = scores.get(sid, 0.0) + s
+    ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:limit]
+    return [(score, sections[sid]) for sid, score in ranked]
+
+def snippet(text: str, query: str, mark=("【", "】")) -> str:
+    """取第一个命中附近的一段文字，并标出所有命中"""
+    flat = re.sub(r"\s+", " ", text)
+    words = sorted({w for w in re.split(r"\s+", query.lower()) if w}, key=len, reverse=True)
+    # 整词找不到时退回到二字/单词片段
+    needles = [w for w in words if w in flat.lower()] or \
+              sorted({t for t in query_terms(query) if t in flat.lower()}, key=len, reverse=True)
+    if not needles:
+        return flat[:SNIPPET_RADIUS * 2]
+    lower = flat.lower()
+    first = min(lower.find(w) for w in needles)
+    lo, hi = max(0, first - SNIPPET_RADIUS), min(len(flat), first + SNIPPET_RADIUS)
+    piece = flat[lo:hi]
+    pattern = re.compile("|".join(re.escape(w) for w in needles), re.IGNORECASE)
+    piece = pattern.sub(lambda m: mark[0] + m.group(0) + mark[1], piece)
+    return ("…" if lo > 0 else "") + piece + ("…" if hi < len(flat) else "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检索 ProjectLab 全部 Markdown 笔记")
+    parser.add_argument("query", nargs="+", help="检索词，多个词以空格分隔")
+    parser.add_argument("-n", "--limit", type=int, default=10, help="最多显示几条")
+    args = parser.parse_args(argv)
+    query = " ".join(args.query)
+
+    t0 = time.perf_counter()
+    idx, _ = update_index()
+    hits = search(idx, query, args.limit)
+    elapsed = (time.perf_counter() - t0) * 1000
+
+    mark = ("\033[1;33m", "\033[0m") if sys.stdout.isatty() else ("【", "】")
+    for score, sec in hits:
+        anchor = f"#{sec['anchor']}" if sec["anchor"] else ""
+        print(f"{score:6.2f}  {sec['file']}{anchor}  (第 {sec['line']} 行)")
+        if sec["heading"]:
+            print(f"        {sec['heading']}")
+        print(f"        {snippet(sec['text'], query, mark)}")
+    print(f"共 {len(hits)} 条，用时 {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+import lab_perf
+
+# streamlit run perf_dashboard.py
+st.set_page_config(page_title="ProjectLab · 性能看板", page_icon="⏱️", layout="wide")
+
+st.title("⏱️ Streamlit 应用耗时看板")
+st.caption("数据来自 logs/perf/*.json，每次 rerun 结束时写入；分位数取所在分桶的上界。")
+
+RANGES = {"最近 1 小时": 3600, "最近 24 小时": 86400, "最近 7 天": 7 * 86400}
+
+with st.sidebar:
+    range_label = st.radio("时间范围", list(RANGES), index=1)
+    if st.button("🔄 刷新"):
+        st.rerun()
+
+since = time.time() - RANGES[range_label]
+files = sorted(lab_perf.PERF_DIR.glob("*.json"))
+if not files:
+    st.info("尚无统计数据：先运行 pr_screener / lit_manager / idle_picker_web 等应用。")
+    st.stop()
+
+rows = []
+for path in files:
+    for stage, counts in lab_perf.load_summary(path, since).items():
+        rows.append({
+            "应用": path.stem,
+            "阶段": stage,
+            "次数": sum(counts.values()),
+            "p50 (ms)": lab_perf.quantile(counts, 0.50),
+            "p99 (ms)": lab_perf.quantile(counts, 0.99),
+        })
+
+if not rows:
+    st.info(f"{range_label}内没有记录。")
+    st.stop()
+
+df = pd.DataFrame(rows).sort_values(["应用", "阶段"])
+st.dataframe(df, use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(format="%.1f") for c in ("p50 (ms)", "p99 (ms)")})
+
+# 每个应用一张 p50 / p99 对比图
+for app, part in df.groupby("应用"):
+    st.subheader(app)
+    st.bar_chart(part.set_index("阶段")[["p50 (ms)", "p99 (ms)"]])
+
+# 慢 rerun 的 cProfile 结果
+st.divider()
+st.subheader("🐢 慢 rerun 剖析文件")
+profiles = sorted(lab_perf.PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+if profiles:
+    st.caption(f"用 `python -m pstats <文件>` 或 snakeviz 打开；超过 {lab_perf.SLOW_MS:.0f}ms 的 rerun 才会保存。")
+    st.dataframe(pd.DataFrame({"文件": [p.name for p in profiles]}), use_container_width=True, hide_index=True)
+else:
+    st.caption("未开启或尚无慢 rerun。设置 LAB_PERF_PROFILE=1 后启动应用即可采集。")
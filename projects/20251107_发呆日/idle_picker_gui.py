@@ -5,22 +5,28 @@ ZeroPhase · GUI 版灵感抽取器
 功能:
 - 从 idle_pool.md/.csv 随机抽取，滚动动画增强趣味
 - 自动过滤关键词(默认: 交易/策略/量化)与近 N 天去重
-- 支持多次抽取、打开链接、写日志 logs/idle_pick_log.csv
+- 支持多次抽取、打开链接、写日志 logs/idle_pick_log.csv (按月轮转归档，见 pick_log.py)
+- 启动时后台读取 logs/.gui_cache.pkl (清单/近期抽取索引/上次设置)，按 mtime 定时刷新，
+  界面线程不做文件读写
 版本:
-v0.3 · 2025-10-31
+v0.4 · 2025-12-10
 """
 
-import csv, os, re, random, webbrowser
+import csv, os, re, random, webbrowser, pickle, queue, threading
 from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+from pick_log import DEFAULT_LOG, get_logger, last_seen, signature
 
 # ------- 默认参数 -------
 DEFAULT_POOL = r"D:\Quant\ProjectLab\projects\20251107_发呆日\idle_pool.md"
-DEFAULT_LOG  = r"D:\Quant\ProjectLab\projects\20251107_发呆日\logs\idle_pick_log.csv"
 DEFAULT_EXCL = ""  # 空格分隔 交易 策略 量化
 DEFAULT_DEDUP= 30
 DEFAULT_SAMPLES = 1
+CACHE_PATH = os.path.join(os.path.dirname(DEFAULT_LOG), ".gui_cache.pkl")
+CACHE_VERSION = 1
+REFRESH_MS = 3000   # 后台检查清单/日志 mtime 的间隔
+RECENT_DAYS = 366   # 近期索引覆盖的天数，不小于去重天数上限
 
 # ------- 工具 -------
 def normalize(s:str)->str:
@@ -63,38 +69,27 @@ def read_pool(path:str):
                 items.append(line)
     return items
 
-def read_recent_titles(log_path:str, dedup_days:int)->set:
-    if not os.path.exists(log_path): return set()
+def file_sig(path:str):
     try:
-        rows=read_csv_any_encoding(log_path)
+        st=os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def load_cache()->dict:
+    try:
+        with open(CACHE_PATH,"rb") as f:
+            cache=pickle.load(f)
+        return cache if cache.get("version")==CACHE_VERSION else {}
     except Exception:
-        # 备份坏日志
-        try:
-            bak=log_path+f".bak_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            os.replace(log_path,bak)
-        except: pass
-        return set()
-    cutoff=datetime.now().date()-timedelta(days=dedup_days)
-    seen=set()
-    for r in rows:
-        d=(r or {}).get("date",""); t=(r or {}).get("title","")
-        try:
-            if t and datetime.strptime(d,"%Y-%m-%d").date()>=cutoff:
-                seen.add(t)
-        except: continue
-    return seen
-
-def append_log(log_path:str, picks:list):
-    ensure_dir(log_path)
-    exists=os.path.exists(log_path)
-    with open(log_path,"a",encoding="utf-8-sig",newline="") as f:
-        w=csv.DictWriter(f,fieldnames=["date","time","title"])
-        if not exists: w.writeheader()
-        now=datetime.now()
-        for t in picks:
-            w.writerow({"date":now.strftime("%Y-%m-%d"),
-                        "time":now.strftime("%H:%M:%S"),
-                        "title":t})
+        return {}  # 缓存坏了当作冷启动
+
+def save_cache(cache:dict):
+    ensure_dir(CACHE_PATH)
+    tmp=CACHE_PATH+".tmp"
+    with open(tmp,"wb") as f:
+        pickle.dump(dict(cache,version=CACHE_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp,CACHE_PATH)
 
 def filter_candidates(items:list, excl_words:list, seen:set):
     res=[t for t in items
@@ -121,6 +116,18 @@ class ZeroPhaseGUI(tk.Tk):
         self.items=[]
         self.animating=False
         self.anim_job=None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # 后台状态: 清单与近期索引都由后台线程读取，经队列交回界面线程
+        self.pool_path=None; self.pool_sig=None
+        self.log_sig=None; self.recent={}      # {标题: 最近抽到日期}
+        self.session_picks={}                  # 本次运行抽到的，防止被较旧的后台结果覆盖
+        self._bg_queue=queue.Queue()
+        self._bg_busy=True; self._force_pending=False
+        self.var_status.set("载入中...")
+        threading.Thread(target=self._bg_warm_start, daemon=True).start()
+        self.after(100, self._poll_bg)
+        self.after(REFRESH_MS, self._tick_refresh)
 
     def _build_widgets(self):
         # 行1: 路径与浏览
@@ -186,25 +193,23 @@ class ZeroPhaseGUI(tk.Tk):
             self.var_pool.set(p)
 
     def reload_pool(self):
-        try:
-            self.items=read_pool(self.var_pool.get())
-            self.var_status.set(f"载入条目 {len(self.items)} 条")
-        except Exception as e:
-            messagebox.showerror("读取失败", str(e))
+        self.var_status.set("刷新中...")
+        self._spawn_refresh(force=True)
 
     def open_log_dir(self):
         ensure_dir(DEFAULT_LOG)
         os.startfile(os.path.dirname(DEFAULT_LOG))
 
     def start_draw(self):
-        try:
-            if not self.items:
-                self.items=read_pool(self.var_pool.get())
-        except Exception as e:
-            messagebox.showerror("读取失败", str(e)); return
+        if not self.items or self.pool_path!=self.var_pool.get():
+            # 清单尚未载入或刚换了文件：交给后台，界面不等待
+            self.var_status.set("清单载入中，请稍候再抽取")
+            self._spawn_refresh()
+            return
 
         excl=[w.strip() for w in self.var_excl.get().split() if w.strip()]
-        seen=read_recent_titles(DEFAULT_LOG, max(0,int(self.var_dedup.get())))
+        cutoff=datetime.now().date()-timedelta(days=max(0,int(self.var_dedup.get())))
+        seen={t for t,d in self.recent.items() if d>=cutoff}
         cand=filter_candidates(self.items, excl, seen)
         if not cand:
             # 退化为仅关键词过滤
@@ -247,11 +252,104 @@ class ZeroPhaseGUI(tk.Tk):
         for t in picks:
             title,url=split_title_url(t)
             self.lst.insert("", "end", values=(title, url or ""))
-        append_log(DEFAULT_LOG, [normalize(p) for p in picks])
+        titles=[normalize(p) for p in picks]
+        get_logger(DEFAULT_LOG).log(titles)
+        today=datetime.now().date()
+        for t in titles:
+            self.recent[t]=today; self.session_picks[t]=today
 
         self.lbl_display.config(text="完成")
         self.var_status.set(f"抽取 {len(picks)} 条，已写入日志")
 
+    # --- 后台载入 / 缓存 ---
+    def _settings(self)->dict:
+        return {"pool":self.var_pool.get(),"excl":self.var_excl.get(),
+                "dedup":int(self.var_dedup.get()),"samples":int(self.var_samples.get())}
+
+    def _bg_warm_start(self):
+        # 后台线程: 先交出缓存让首抽立即可用，再按 mtime 校验是否过期
+        cache=load_cache()
+        if cache:
+            self._bg_queue.put(("cache",cache))
+        pool=(cache.get("settings") or {}).get("pool") or DEFAULT_POOL
+        self._bg_refresh(pool, cache.get("pool_path"), cache.get("pool_sig"), cache.get("log_sig"), False)
+
+    def _bg_refresh(self, pool, pool_path, pool_sig, log_sig, force):
+        try:
+            out={}
+            sig=file_sig(pool)
+            if force or pool!=pool_path or sig!=pool_sig:
+                out.update(items=read_pool(pool), pool_path=pool, pool_sig=sig)
+            lsig=signature(DEFAULT_LOG)
+            if force or lsig!=log_sig:
+                since=datetime.now().date()-timedelta(days=RECENT_DAYS)
+                out.update(recent=last_seen(DEFAULT_LOG, since=since), log_sig=lsig)
+            self._bg_queue.put(("refresh",out))
+        except Exception as e:
+            self._bg_queue.put(("error",str(e)))
+
+    def _spawn_refresh(self, force=False):
+        if self._bg_busy:
+            self._force_pending|=force  # 当前这轮结束后再强制刷新一次
+            return
+        self._bg_busy=True
+        args=(self.var_pool.get(), self.pool_path, self.pool_sig, self.log_sig, force)
+        threading.Thread(target=self._bg_refresh, args=args, daemon=True).start()
+
+    def _tick_refresh(self):
+        if not self.animating:
+            self._spawn_refresh()
+        self.after(REFRESH_MS, self._tick_refresh)
+
+    def _poll_bg(self):
+        try:
+            while True:
+                kind,payload=self._bg_queue.get_nowait()
+                if kind=="cache":
+                    self._apply_cache(payload)
+                elif kind=="refresh":
+                    self._bg_busy=False
+                    self._apply_refresh(payload)
+                else:
+                    self._bg_busy=False
+                    self.var_status.set(f"读取失败: {payload}")
+        except queue.Empty:
+            pass
+        if self._force_pending and not self._bg_busy:
+            self._force_pending=False
+            self._spawn_refresh(force=True)
+        self.after(100, self._poll_bg)
+
+    def _apply_cache(self, cache:dict):
+        st=cache.get("settings") or {}
+        if st:
+            self.var_pool.set(st.get("pool",DEFAULT_POOL)); self.var_excl.set(st.get("excl",DEFAULT_EXCL))
+            self.var_dedup.set(st.get("dedup",DEFAULT_DEDUP)); self.var_samples.set(st.get("samples",DEFAULT_SAMPLES))
+        self._apply_refresh(cache)
+
+    def _apply_refresh(self, out:dict):
+        if "items" in out and out.get("pool_path")==self.var_pool.get():
+            self.items=out["items"]; self.pool_path=out["pool_path"]; self.pool_sig=out["pool_sig"]
+            self.var_status.set(f"载入条目 {len(self.items)} 条")
+        if "recent" in out:
+            self.recent=dict(out["recent"]); self.log_sig=out["log_sig"]
+            for t,d in self.session_picks.items():
+                if self.recent.get(t) is None or self.recent[t]<d: self.recent[t]=d
+
+    def on_close(self):
+        # 缓冲中的抽取记录落盘、保存缓存后再退出
+        try:
+            get_logger(DEFAULT_LOG).flush()
+        except Exception as e:
+            messagebox.showerror("日志写入失败", str(e))
+        # 记下 recent 实际对应的日志签名；本次新落盘的记录会让下次启动时签名不符而重新扫描
+        try:
+            save_cache({"settings":self._settings(),"pool_path":self.pool_path,"pool_sig":self.pool_sig,
+                        "items":self.items,"log_sig":self.log_sig,"recent":self.recent})
+        except Exception:
+            pass  # 缓存写不进去只影响下次启动速度
+        self.destroy()
+
     def open_selected_url(self):
         sel=self.lst.selection()
         if not sel:
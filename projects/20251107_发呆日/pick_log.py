@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ZeroPhase · 抽取日志存储
+布局 (以 logs/idle_pick_log.csv 为例):
+- idle_pick_log.csv                        当月活动段，只追加
+- idle_pick_log.segments/2025-10.csv       已轮转的月度段
+- idle_pick_log.archive/2025-08.json.gz    压缩后的列式归档，按月分区
+功能:
+- 按月轮转活动段，超过 KEEP_MONTHS 的月度段压缩为列式归档
+- 追加为单次 write + fsync，崩溃残留的半行在追加前截掉（末尾缺换行的完整记录则补上换行）；坏行读取时跳过，不再整文件备份
+- 按时间窗口查询只读取与窗口重叠的分区
+- 读写都经过 <log>.lock 文件锁；已解析的分区按 (mtime, size) 缓存为快照
+- PickLogger 缓冲写入，定时或退出时批量落盘，供多个 Streamlit 会话与 GUI 共用；缓冲锁不跨 I/O 持有
+"""
+
+import atexit, csv, gzip, io, json, os, re, threading, time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+FIELDS = ["date", "time", "title"]
+KEEP_MONTHS = 3  # 活动段之外保留为 CSV 的月份数，更早的进入归档
+ENCODINGS = ["utf-8-sig", "gbk", "utf-16"]
+FLUSH_INTERVAL = 2.0  # 缓冲写入的最长滞留秒数
+LOCK_TIMEOUT = 10.0
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "idle_pick_log.csv")
+
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})")
+
+
+# ------- 路径与分区 -------
+def segments_dir(log_path: str) -> str:
+    return os.path.splitext(log_path)[0] + ".segments"
+
+def archive_dir(log_path: str) -> str:
+    return os.path.splitext(log_path)[0] + ".archive"
+
+def month_key(date_str: str):
+    """'2025-10-31' -> '2025-10'；无法识别返回 None"""
+    m = _MONTH_RE.match(date_str or "")
+    return f"{m.group(1)}-{m.group(2)}" if m else None
+
+def _parse_date(date_str: str):
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+def _shift_month(month: str, delta: int) -> str:
+    y, m = int(month[:4]), int(month[5:7])
+    n = y * 12 + (m - 1) + delta
+    return f"{n // 12:04d}-{n % 12 + 1:02d}"
+
+def _list_partitions(folder: str, suffix: str) -> dict:
+    """{month: path}，只看文件名，不读内容"""
+    parts = {}
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            if name.endswith(suffix) and month_key(name) == name[:7]:
+                parts[name[:7]] = os.path.join(folder, name)
+    return parts
+
+
+# ------- 文件锁 -------
+_proc_locks = {}      # abspath -> RLock，同进程线程先在这里排队
+_lock_depth = {}      # abspath -> 重入深度，只在持有对应 RLock 时读写
+_proc_guard = threading.Lock()
+
+def _try_os_lock(fd) -> bool:
+    try:
+        if os.name == "nt":
+            import msvcrt
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _os_unlock(fd):
+    if os.name == "nt":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+@contextmanager
+def file_lock(log_path: str, timeout: float = LOCK_TIMEOUT):
+    """对日志加跨进程互斥锁（可重入）；轮转、追加与读取都在锁内进行"""
+    key = os.path.abspath(log_path)
+    with _proc_guard:
+        rlock = _proc_locks.setdefault(key, threading.RLock())
+    with rlock:
+        if _lock_depth.get(key):
+            _lock_depth[key] += 1
+            try:
+                yield
+            finally:
+                _lock_depth[key] -= 1
+            return
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        fd = os.open(key + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            deadline = time.monotonic() + timeout
+            while not _try_os_lock(fd):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"日志被占用: {log_path}")
+                time.sleep(0.02)
+            _lock_depth[key] = 1
+            try:
+                yield
+            finally:
+                _lock_depth[key] = 0
+                _os_unlock(fd)
+        finally:
+            os.close(fd)
+
+
+# ------- 读取 -------
+def _decode(raw: bytes) -> str:
+    for enc in ENCODINGS:
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("utf-8", errors="replace")
+
+def _is_record(line: bytes) -> bool:
+    """一行是否是完整记录：三列且日期可解析（用于判断末尾无换行的一行是手改还是写坏）"""
+    rec = next(csv.reader([_decode(line).replace("\x00", "").strip("\r\n")]), [])
+    return len(rec) == 3 and _parse_date(rec[0].strip()) is not None
+
+def read_csv_rows(path: str) -> list:
+    """读取一个 CSV 段；残行、空行与多余列均被容忍，不抛异常"""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return []
+    # 末尾无换行的一行：完整记录（手工编辑后没留换行）照常读，写了一半的残行不当作记录
+    cut = raw.rfind(b"\n") + 1
+    if cut < len(raw) and not _is_record(raw[cut:]):
+        raw = raw[:cut]
+    text = _decode(raw).replace("\x00", "")
+    rows = []
+    for rec in csv.reader(io.StringIO(text, newline="")):
+        if len(rec) < 3 or rec[:3] == FIELDS:
+            continue
+        rows.append({"date": rec[0].strip(), "time": rec[1].strip(), "title": rec[2].strip()})
+    return rows
+
+def _load_archive(path: str) -> list:
+    """严格读取归档；文件损坏时抛异常（压缩前必须用这个，不能把坏归档当空的覆盖掉）"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        cols = json.load(f)["columns"]
+    return [dict(zip(FIELDS, vals)) for vals in zip(*(cols[k] for k in FIELDS))]
+
+def read_archive_rows(path: str) -> list:
+    try:
+        return _load_archive(path)
+    except (OSError, EOFError, ValueError, KeyError, TypeError):
+        return []
+
+_snapshots = {}  # path -> ((mtime_ns, size), rows)
+_snap_guard = threading.Lock()
+
+def _snapshot(path: str, reader) -> tuple:
+    """分区的只读快照；文件未变时直接复用上次的解析结果"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return ()
+    sig = (st.st_mtime_ns, st.st_size)
+    with _snap_guard:
+        hit = _snapshots.get(path)
+    if hit and hit[0] == sig:
+        return hit[1]
+    rows = tuple(reader(path))
+    with _snap_guard:
+        _snapshots[path] = (sig, rows)
+    return rows
+
+def _write_archive(path: str, month: str, rows: list):
+    payload = {"version": 1, "month": month,
+               "columns": {k: [r[k] for r in rows] for k in FIELDS}}
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    tmp = path + ".tmp"
+    # 落盘后再替换：随后会删掉月度段，归档就是唯一的副本
+    with open(tmp, "wb") as f:
+        with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+            gz.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ------- 写入 -------
+def _csv_bytes(rows: list, header: bool) -> bytes:
+    buf = io.StringIO(newline="")
+    w = csv.DictWriter(buf, fieldnames=FIELDS, extrasaction="ignore", lineterminator="\r\n")
+    if header:
+        w.writeheader()
+    w.writerows(rows)
+    data = buf.getvalue().encode("utf-8")
+    return (b"\xef\xbb\xbf" + data) if header else data
+
+def _repair_tail(path: str):
+    """末尾无换行的一行：是完整记录就补上换行，写了一半的残行截掉（需持有文件锁）"""
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            nl = f.read(step).rfind(b"\n")
+            if nl >= 0:
+                keep = pos + nl + 1
+                break
+        else:
+            keep = 0
+        if keep == end:
+            return
+        f.seek(keep)
+        if _is_record(f.read()):
+            f.seek(0, os.SEEK_END)
+            f.write(b"\r\n")
+        else:
+            f.truncate(keep)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _append_bytes(path: str, rows: list):
+    """单次 O_APPEND 写入 + fsync；调用方已处理好末尾残行"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+    data = _csv_bytes(rows, header=fresh)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _rewrite_csv(path: str, rows: list):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_csv_bytes(rows, header=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def make_rows(titles: list, now: datetime = None) -> list:
+    now = now or datetime.now()
+    return [{"date": now.strftime("%Y-%m-%d"), "time": now.strftime("%H:%M:%S"), "title": t}
+            for t in titles]
+
+def append_rows(log_path: str, rows: list):
+    """加锁追加一批记录；跨月时先轮转"""
+    if not rows:
+        return
+    with file_lock(log_path):
+        _repair_tail(log_path)
+        rotate(log_path, today=_parse_date(rows[-1]["date"]))
+        _append_bytes(log_path, rows)
+
+def append_picks(log_path: str, titles: list, now: datetime = None):
+    """立即写入抽取记录；交互场景优先用 get_logger(log_path).log()"""
+    append_rows(log_path, make_rows(titles, now))
+
+
+class PickLogger:
+    """缓冲写入器：记录先进内存，FLUSH_INTERVAL 秒内或进程退出时批量落盘"""
+
+    def __init__(self, log_path: str, flush_interval: float = FLUSH_INTERVAL):
+        self.log_path = log_path
+        self.flush_interval = flush_interval
+        self._buf = []
+        self._inflight = []  # 已从缓冲取出、正在写盘的一批
+        self._lock = threading.Lock()  # 只保护上面几个字段，不跨 I/O 持有
+        self._flush_lock = threading.Lock()  # 串行化 flush
+        self._timer = None
+
+    def log(self, titles: list, now: datetime = None):
+        rows = make_rows(titles, now)
+        with self._lock:
+            self._buf.extend(rows)
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def pending(self) -> list:
+        """尚未落盘的记录（含正在写的一批），按时间顺序"""
+        with self._lock:
+            return self._inflight + self._buf
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch, self._buf = self._buf, []
+                self._inflight = batch
+            if not batch:
+                return
+            try:
+                # 清空 _inflight 与写盘在同一把文件锁内，持文件锁的读者不会重复或漏看这一批
+                with file_lock(self.log_path):
+                    append_rows(self.log_path, batch)
+                    with self._lock:
+                        self._inflight = []
+            except OSError:
+                with self._lock:  # 锁超时或磁盘错误：放回缓冲前部，稍后重试
+                    self._buf = batch + self._buf
+                    self._inflight = []
+                    self._schedule()
+                raise
+
+
+_loggers = {}
+_loggers_guard = threading.Lock()
+
+def get_logger(log_path: str = DEFAULT_LOG) -> PickLogger:
+    """同一进程内同一日志共用一个缓冲写入器"""
+    key = os.path.abspath(log_path)
+    with _loggers_guard:
+        if key not in _loggers:
+            _loggers[key] = PickLogger(log_path)
+        return _loggers[key]
+
+def flush_all():
+    with _loggers_guard:
+        loggers = list(_loggers.values())
+    for lg in loggers:
+        lg.flush()
+
+atexit.register(flush_all)
+
+
+# ------- 生命周期 -------
+def _first_row_month(path: str):
+    """只读文件头部判断活动段起始月份，避免每次追加都整文件解析"""
+    with open(path, "rb") as f:
+        head = _decode(f.read(4096))
+    for line in head.splitlines()[1:]:
+        m = month_key(line)
+        if m:
+            return m
+    return None
+
+def rotate(log_path: str, today=None, keep_months: int = KEEP_MONTHS) -> bool:
+    """把活动段中早于当月的记录移入月度段，并压缩过期段；有改动返回 True"""
+    with file_lock(log_path):
+        return _rotate_locked(log_path, today, keep_months)
+
+def _rotate_locked(log_path: str, today, keep_months: int) -> bool:
+    if not os.path.exists(log_path):
+        return False
+    current = (today or datetime.now().date()).strftime("%Y-%m")
+    first = _first_row_month(log_path)
+    if first is None or first >= current:
+        return False
+
+    rows = read_csv_rows(log_path)
+    keep, moved = [], {}
+    for r in rows:
+        m = month_key(r["date"])
+        if m is None or m >= current:
+            keep.append(r)
+        else:
+            moved.setdefault(m, []).append(r)
+
+    seg_dir = segments_dir(log_path)
+    os.makedirs(seg_dir, exist_ok=True)
+    for m, new_rows in moved.items():
+        seg = os.path.join(seg_dir, f"{m}.csv")
+        old = read_csv_rows(seg)
+        # 上次轮转若在替换活动段前中断，同样的行会再来一次，这里按整行去重
+        known = {tuple(r[k] for k in FIELDS) for r in old}
+        merged = old + [r for r in new_rows if tuple(r[k] for k in FIELDS) not in known]
+        _rewrite_csv(seg, merged)
+    _rewrite_csv(log_path, keep)
+
+    _compact_locked(log_path, today, keep_months)
+    return True
+
+def compact(log_path: str, today=None, keep_months: int = KEEP_MONTHS) -> list:
+    """把早于 (当月 - keep_months) 的月度段转为列式归档，返回被归档的月份"""
+    with file_lock(log_path):
+        return _compact_locked(log_path, today, keep_months)
+
+def _compact_locked(log_path: str, today, keep_months: int) -> list:
+    current = (today or datetime.now().date()).strftime("%Y-%m")
+    horizon = _shift_month(current, -keep_months)
+    arc_dir = archive_dir(log_path)
+    done = []
+    for m, seg in sorted(_list_partitions(segments_dir(log_path), ".csv").items()):
+        if m >= horizon:
+            continue
+        os.makedirs(arc_dir, exist_ok=True)
+        arc = os.path.join(arc_dir, f"{m}.json.gz")
+        try:
+            old = _load_archive(arc) if os.path.exists(arc) else []
+        except (OSError, EOFError, ValueError, KeyError, TypeError):
+            continue  # 已有归档读不出来：保留月度段，不拿新行覆盖它
+        # 上次压缩若在删除月度段前中断，同样的行会再来一次，这里按整行去重
+        known = {tuple(r[k] for k in FIELDS) for r in old}
+        rows = old + [r for r in read_csv_rows(seg) if tuple(r[k] for k in FIELDS) not in known]
+        _write_archive(arc, m, rows)
+        os.remove(seg)
+        done.append(m)
+    return done
+
+
+# ------- 查询 -------
+def _partitions(log_path: str, lo=None, hi=None) -> list:
+    """[(month, kind, path)]，kind: 0=归档 1=月度段；按月份升序"""
+    parts = [(m, 0, p) for m, p in _list_partitions(archive_dir(log_path), ".json.gz").items()]
+    parts += [(m, 1, p) for m, p in _list_partitions(segments_dir(log_path), ".csv").items()]
+    return sorted(x for x in parts if (lo is None or x[0] >= lo) and (hi is None or x[0] <= hi))
+
+def _read_partition(kind: int, path: str) -> tuple:
+    return _snapshot(path, read_archive_rows if kind == 0 else read_csv_rows)
+
+@contextmanager
+def _consistent(log_path: str):
+    """读者视图：持有文件锁，产出 (同进程尚未落盘的记录)；缓冲锁只在复制时短暂持有"""
+    lg = _loggers.get(os.path.abspath(log_path))
+    with file_lock(log_path):
+        yield lg.pending() if lg else []
+
+def iter_rows(log_path: str, since=None, until=None):
+    """按时间顺序产出记录（含缓冲中的）；只打开与 [since, until] 月份重叠的分区"""
+    lo = since.strftime("%Y-%m") if since else None
+    hi = until.strftime("%Y-%m") if until else None
+    rows = []
+    with _consistent(log_path) as pending:
+        for _, kind, p in _partitions(log_path, lo, hi):
+            rows.extend(_read_partition(kind, p))
+        # 活动段可能还没来得及轮转，始终读取
+        rows.extend(_snapshot(log_path, read_csv_rows))
+        rows.extend(pending)
+    yield from rows
+
+def recent_titles(log_path: str, dedup_days: int, today=None) -> set:
+    """最近 dedup_days 天内抽到过的标题"""
+    cutoff = (today or datetime.now().date()) - timedelta(days=dedup_days)
+    seen = set()
+    for r in iter_rows(log_path, since=cutoff):
+        d = _parse_date(r["date"])
+        if r["title"] and d and d >= cutoff:
+            seen.add(r["title"])
+    return seen
+
+def last_seen(log_path: str, since=None) -> dict:
+    """{标题: 最近一次抽到的日期}，供调用方自行缓存并按任意天数去重"""
+    seen = {}
+    for r in iter_rows(log_path, since=since):
+        d = _parse_date(r["date"])
+        t = r["title"]
+        if t and d and (t not in seen or d > seen[t]):
+            seen[t] = d
+    return seen
+
+def signature(log_path: str) -> tuple:
+    """活动段与两个分区目录的 (mtime, size)；任一变化说明日志内容可能变了"""
+    sig = []
+    for p in (log_path, segments_dir(log_path), archive_dir(log_path)):
+        try:
+            st = os.stat(p)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+def tail(log_path: str, n: int = 10) -> list:
+    """最新的 n 条记录，新的在前；从缓冲与活动段往回翻，够数即停"""
+    with _consistent(log_path) as pending:
+        out = list(reversed(pending))
+        out.extend(reversed(_snapshot(log_path, read_csv_rows)))
+        if len(out) < n:
+            for _, kind, p in reversed(_partitions(log_path)):
+                out.extend(reversed(_read_partition(kind, p)))
+                if len(out) >= n:
+                    break
+    return out[:n]
+
+
+if __name__ == "__main__":
+    import sys
+    target = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    changed = rotate(target)
+    archived = compact(target)
+    print(f"轮转: {'是' if changed else '否'}，归档月份: {', '.join(archived) or '无'}")
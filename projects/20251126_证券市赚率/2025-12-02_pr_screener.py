@@ -14,113 +14,174 @@ os.environ['NO_PROXY'] = '*' # 强制所有地址不走代理
 # ==========================================
 # 正常逻辑区
 # ==========================================
+import sys
+from pathlib import Path
+
 import streamlit as st
 import akshare as ak
 import pandas as pd
 import plotly.graph_objects as go
 
-# 1. 页面配置
-st.set_page_config(page_title="个股PR估值诊断", layout="centered")
+# ProjectLab 根目录，引入共用的 lab_perf 耗时统计；每次 rerun 都会执行到这里，只插入一次
+LAB_ROOT = str(Path(__file__).resolve().parents[2])
+if LAB_ROOT not in sys.path:
+    sys.path.insert(0, LAB_ROOT)
+import lab_perf
+from grading import RULES_FILE, RuleError, load_rules, spot_frame
+from snapshot_diff import SnapshotStore, top_movers
+
+# 异常、st.stop 与 rerun 中断也要结束计时，否则 cProfile 一直开着
+with lab_perf.rerun("pr_screener"):
+    # 1. 页面配置
+    st.set_page_config(page_title="个股PR估值诊断", layout="centered")
+
+    st.title("🔬 个股估值诊断器 (PR Model)")
+    st.markdown("Quant Approach to Value Investing | Target: **Specific Stock**")
 
-st.title("🔬 个股估值诊断器 (PR Model)")
-st.markdown("Quant Approach to Value Investing | Target: **Specific Stock**")
+    # 2. 用户输入区
+    with st.form("stock_input_form"):
+        col_input, col_btn = st.columns([4, 1])
+        with col_input:
+            symbol_input = st.text_input("输入股票代码 (A股)", value="600519", help="例如：600519 或 000858")
+        with col_btn:
+            submitted = st.form_submit_button("开始诊断")
 
-# 2. 用户输入区
-with st.form("stock_input_form"):
-    col_input, col_btn = st.columns([4, 1])
-    with col_input:
-        symbol_input = st.text_input("输入股票代码 (A股)", value="600519", help="例如：600519 或 000858")
-    with col_btn:
-        submitted = st.form_submit_button("开始诊断")
+    # 档位规则：grading_rules.json 修改后按 mtime 自动重新编译
+    @st.cache_resource
+    def get_rules(version):
+        return load_rules()
 
-# 3. 数据获取引擎
-@st.cache_data(ttl=600)
-def get_stock_spot(symbol):
+    rules_version = RULES_FILE.stat().st_mtime_ns
     try:
-        # 再次强制指定 Akshare 内部请求不使用代理（防御性编程）
-        # 虽然上面的 os.environ 通常够了，但这能确保万无一失
+        rules = get_rules(rules_version)
+    except RuleError as e:
+        st.error(f"档位规则文件有误：{e}")
+        st.stop()
+
+    with st.sidebar:
+        rule_name = st.selectbox("档位规则", list(rules), format_func=lambda k: rules[k].title)
+    ruleset = rules[rule_name]
+
+    # 3. 数据获取引擎
+    @st.cache_resource
+    def get_snapshot_store(version):
+        # 进程内所有会话共用：保留最近几次全市场快照与档位变动提醒；规则变了就重新开始
+        return SnapshotStore(list(get_rules(version).values()))
+
+    @st.cache_data(ttl=600)
+    def get_spot_table():
+        # 全市场行情只在缓存过期时拉一次，换股票不再重复请求；每次真正刷新都记一次快照
         df = ak.stock_zh_a_spot_em()
-        
-        # 数据清洗
-        target = df[df['代码'] == symbol]
-        
-        if target.empty:
+        get_snapshot_store(rules_version).push(df)
+        return df
+
+    def get_stock_spot(symbol):
+        try:
+            # 再次强制指定 Akshare 内部请求不使用代理（防御性编程）
+            # 虽然上面的 os.environ 通常够了，但这能确保万无一失
+            df = get_spot_table()
+
+            # 数据清洗
+            target = df[df['代码'] == symbol]
+
+            if target.empty:
+                return None
+
+            data = {
+                'name': target['名称'].values[0],
+                'price': float(target['最新价'].values[0]),
+                'pe_ttm': float(target['市盈率-动态'].values[0]),
+                'pb': float(target['市净率'].values[0]),
+                'market_cap': float(target['总市值'].values[0])
+            }
+            return data
+        except Exception as e:
+            # 将具体的错误打印出来，方便调试
+            st.error(f"数据源连接失败。错误详情: {e}")
             return None
-            
-        data = {
-            'name': target['名称'].values[0],
-            'price': float(target['最新价'].values[0]),
-            'pe_ttm': float(target['市盈率-动态'].values[0]),
-            'pb': float(target['市净率'].values[0]),
-            'market_cap': float(target['总市值'].values[0])
-        }
-        return data
-    except Exception as e:
-        # 将具体的错误打印出来，方便调试
-        st.error(f"数据源连接失败。错误详情: {e}")
-        return None
-
-# 4. 核心逻辑与渲染
-if submitted or symbol_input:
-    # 加一个简单的 Loading 提示
-    with st.spinner(f'正在直连交易所数据源拉取 {symbol_input}...'):
-        data = get_stock_spot(symbol_input)
-    
-    if data:
-        # 计算逻辑
-        if data['pe_ttm'] > 0:
-            roe_implied = (data['pb'] / data['pe_ttm']) * 100
-            pr_ratio = data['pe_ttm'] / roe_implied
+
+    # 4. 核心逻辑与渲染
+    if submitted or symbol_input:
+        # 加一个简单的 Loading 提示
+        with st.spinner(f'正在直连交易所数据源拉取 {symbol_input}...'), lab_perf.span("load"):
+            data = get_stock_spot(symbol_input)
+
+        if data:
+            # 计算逻辑：按所选规则一次求值（排除 / 异常标记 / 分档）
+            with lab_perf.span("compute"):
+                quote = pd.DataFrame([{'市盈率-动态': data['pe_ttm'], '市净率': data['pb'], '最新价': data['price']}])
+                frame = spot_frame(quote)
+                res = ruleset.evaluate(frame).iloc[0]
+                roe_implied = frame['roe'].iloc[0]
+                pr_ratio = res['pr']
+                grade_code = int(res['grade_code'])
+                grade = ruleset.grade_info(grade_code)
+
+            with lab_perf.span("render"):
+                st.divider()
+                st.header(f"{data['name']} ({symbol_input})")
+
+                # 指标展示
+                c1, c2, c3 = st.columns(3)
+                c1.metric("PE (动态)", f"{data['pe_ttm']:.2f}")
+                c2.metric("隐含 ROE", f"{roe_implied:.2f}%" if pd.notna(roe_implied) else "—")
+
+                # PR 颜色逻辑：最低档绿、最高档红
+                delta_color = "off"
+                if grade_code == 0: delta_color = "inverse" # 绿
+                elif grade_code == len(ruleset.grades) - 1: delta_color = "normal" # 红
+
+                c3.metric("PR (市赚率)", f"{pr_ratio:.2f}" if pd.notna(pr_ratio) else "—", delta="越低越好", delta_color=delta_color)
+
+                # 仪表盘：分段来自规则的边界与颜色
+                if grade is not None:
+                    axis_max = max(4.0, float(ruleset.bounds[-1]) * 2)
+                    edges = [0.0] + [float(b) for b in ruleset.bounds] + [axis_max]
+                    fig = go.Figure(go.Indicator(
+                        mode = "gauge+number",
+                        value = pr_ratio,
+                        domain = {'x': [0, 1], 'y': [0, 1]},
+                        title = {'text': f"PR 估值温度计 · {ruleset.title}"},
+                        gauge = {
+                            'axis': {'range': [0, axis_max]},
+                            'bar': {'color': "black"},
+                            'steps': [{'range': [lo, hi], 'color': g['color']}
+                                      for lo, hi, g in zip(edges, edges[1:], ruleset.grades)],
+                            'threshold': {
+                                'line': {'color': "red", 'width': 4},
+                                'thickness': 0.75, 'value': pr_ratio
+                            }
+                        }
+                    ))
+                    st.plotly_chart(fig, use_container_width=True)
+
+                # 诊断结论
+                st.subheader("📝 深度诊断")
+                if res['excluded']:
+                    st.info(f"🚫 **不计算 PR** | {res['exclude_reason']}，该股退出市赚率体系。")
+                elif grade is None:
+                    st.info("数据缺失，无法分档。")
+                else:
+                    # level 已由 grading 校验，只映射到这几种提示，不按名字取 st 上的任意函数
+                    icon = {"success": "✅", "warning": "⚠️", "error": "⛔", "info": "ℹ️"}[grade['level']]
+                    notify = {"success": st.success, "warning": st.warning, "error": st.error, "info": st.info}[grade['level']]
+                    notify(f"{icon} **{grade['name']}** · {grade['label']} | PR={pr_ratio:.2f}。{grade['message']}")
+                if res['flagged']:
+                    st.warning(f"🔎 **需人工复核** | {res['flag_reason']}")
+
         else:
-            roe_implied = 0
-            pr_ratio = 999 # 亏损股处理
-
-        st.divider()
-        st.header(f"{data['name']} ({symbol_input})")
-        
-        # 指标展示
-        c1, c2, c3 = st.columns(3)
-        c1.metric("PE (动态)", f"{data['pe_ttm']:.2f}")
-        c2.metric("隐含 ROE", f"{roe_implied:.2f}%")
-        
-        # PR 颜色逻辑
-        delta_color = "off"
-        if pr_ratio < 0.75: delta_color = "inverse" # 绿
-        elif pr_ratio > 1.5: delta_color = "normal" # 红
-        
-        c3.metric("PR (市赚率)", f"{pr_ratio:.2f}", delta="越低越好", delta_color=delta_color)
-
-        # 仪表盘
-        fig = go.Figure(go.Indicator(
-            mode = "gauge+number",
-            value = pr_ratio,
-            domain = {'x': [0, 1], 'y': [0, 1]},
-            title = {'text': "PR 估值温度计"},
-            gauge = {
-                'axis': {'range': [0, 4]},
-                'bar': {'color': "black"},
-                'steps': [
-                    {'range': [0, 0.75], 'color': "#2ecc71"},
-                    {'range': [0.75, 1.5], 'color': "#f1c40f"},
-                    {'range': [1.5, 4], 'color': "#e74c3c"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75, 'value': pr_ratio
-                }
-            }
-        ))
-        st.plotly_chart(fig, use_container_width=True)
-
-        # 诊断结论
-        st.subheader("📝 深度诊断")
-        if pr_ratio < 0.75:
-            st.success(f"✅ **击球区** | PR={pr_ratio:.2f}。资产极具性价比，如果商业模式稳健，属于“捡钱”区间。")
-        elif 0.75 <= pr_ratio < 1.5:
-            st.warning(f"⚠️ **观察区** | PR={pr_ratio:.2f}。价格公允，需要极强的成长性才能支撑买入。")
+            # 如果还是报错，说明可能IP被暂时封了
+            st.warning(f"未找到代码 {symbol_input}。如果是网络报错，请尝试关闭所有 VPN 软件后重试。")
+
+    # 5. 快照对比：行情每次刷新后，与上一次相比跨越档位的股票
+    store = get_snapshot_store(rules_version)
+    with lab_perf.span("render_alerts"), st.expander(f"📡 档位变动提醒（已保留 {len(store)} 次快照）"):
+        alerts = store.alerts()
+        if alerts.empty:
+            st.caption("至少需要两次行情刷新（缓存 10 分钟过期）才会产生对比。")
         else:
-            st.error(f"⛔ **高估区** | PR={pr_ratio:.2f}。透支了未来业绩，安全边际不足。")
-            
-    else:
-        # 如果还是报错，说明可能IP被暂时封了
-        st.warning(f"未找到代码 {symbol_input}。如果是网络报错，请尝试关闭所有 VPN 软件后重试。")
\ No newline at end of file
+            st.dataframe(alerts, use_container_width=True, hide_index=True)
+            st.markdown("**最近一次刷新 PR 变动最大**")
+            movers = top_movers(store.latest_diff(), 10)
+            st.dataframe(movers[["代码", "名称", "PR_旧", "PR_新", "ΔPR", f"{ruleset.short}_旧", f"{ruleset.short}_新"]],
+                         use_container_width=True, hide_index=True)
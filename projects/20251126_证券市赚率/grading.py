@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+市赚率档位规则引擎
+- 阈值、排除规则（EPS ≤ 0 / ROE ≤ 0）、异常标记（PE > 80 / ROE > 60）、行业阈值覆盖
+  都写在 grading_rules.json，改规则不用改代码
+- 每套规则只编译一次为 RuleSet，对整张快照或年表一次性向量化求值，不逐行循环
+- 被排除的股票 PR 记为 NaN，不再用 999 占位；PE = 0 等导致的 ±inf 先视为缺失，不参与分档
+
+grading_rules.json 结构：
+    exclude / flags : [{field, op, value, reason}]，field 取 pe / roe / eps / pr
+    rulesets.<名称> :
+        bounds     档位边界，升序
+        closed     "right" 表示 PR ≤ 边界归入较低档（手册口径），"left" 表示 PR < 边界
+        grades     len(bounds)+1 个档位：name / label / level(success|warning|error|info) / color / message
+        industries {"行业名": [边界...]}，按输入的 industry 列覆盖 bounds
+        exclude / flags 可在单套规则内覆盖全局设置
+"""
+
+import json
+import operator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RULES_FILE = Path(__file__).resolve().parent / "grading_rules.json"
+NO_GRADE = -1  # 被排除或数据缺失
+FIELDS = ("pe", "roe", "eps", "pr")  # 排除 / 标记条件可用的字段
+LEVELS = ("success", "warning", "error", "info")  # 对应页面上的提示样式
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+        "==": operator.eq, "!=": operator.ne}
+
+
+class RuleError(ValueError):
+    """规则文件写错时抛出，消息指明是哪一条"""
+
+
+def _compile_conditions(specs: list, where: str) -> list:
+    out = []
+    for i, c in enumerate(specs):
+        try:
+            if c["field"] not in FIELDS:
+                raise ValueError(f"field 只能是 {' / '.join(FIELDS)}")
+            op = _OPS[c["op"]]
+            out.append((c["field"], op, float(c["value"]), c.get("reason") or f"{c['field']} {c['op']} {c['value']}"))
+        except (KeyError, TypeError, ValueError) as e:
+            raise RuleError(f"{where}[{i}] 无效: {c!r} ({e})") from None
+    return out
+
+
+def _eval_conditions(conds: list, cols: dict, n: int):
+    """返回 (命中任一条的布尔数组, 原因字符串数组)"""
+    hit = np.zeros(n, dtype=bool)
+    reasons = pd.Series([""] * n, dtype=object)
+    for field, op, value, reason in conds:
+        x = cols.get(field)
+        if x is None:
+            continue  # 只有 eps 是可选列：输入里没有时这一条不适用
+        with np.errstate(invalid="ignore"):
+            m = op(x, value)
+        hit |= m
+        reasons = reasons + np.where(m, reason + "；", "")
+    return hit, reasons.str.rstrip("；").to_numpy(dtype=object)
+
+
+def _finite(col) -> np.ndarray:
+    """转为 float64，±inf 记为 NaN（如 PE = 0 推出的 ROE、EPS）"""
+    x = np.asarray(col, dtype=np.float64)
+    return np.where(np.isfinite(x), x, np.nan)
+
+
+class RuleSet:
+    """编译后的一套档位规则"""
+
+    def __init__(self, name: str, spec: dict, exclude: list, flags: list):
+        self.name = name
+        self.title = spec.get("title", name)
+        self.short = spec.get("short", name)
+        self.grades = spec["grades"]
+        bounds = np.asarray(spec["bounds"], dtype=np.float64)
+        if bounds.ndim != 1 or np.any(np.diff(bounds) <= 0):
+            raise RuleError(f"{name}.bounds 必须严格升序: {spec['bounds']}")
+        if len(self.grades) != len(bounds) + 1:
+            raise RuleError(f"{name}: grades 应有 {len(bounds) + 1} 个，实际 {len(self.grades)}")
+        for i, g in enumerate(self.grades):
+            if g.get("level") not in LEVELS:
+                raise RuleError(f"{name}.grades[{i}].level 只能是 {' / '.join(LEVELS)}: {g.get('level')!r}")
+        self.closed = spec.get("closed", "right")
+        if self.closed not in ("left", "right"):
+            raise RuleError(f"{name}.closed 只能是 left / right")
+
+        # 第 0 行为默认边界，其余行为行业覆盖；求值时按行业取行
+        industries = spec.get("industries") or {}
+        rows = [bounds]
+        self._industry_row = {}
+        for ind, b in industries.items():
+            b = np.asarray(b, dtype=np.float64)
+            if b.shape != bounds.shape or np.any(np.diff(b) <= 0):
+                raise RuleError(f"{name}.industries[{ind}] 应为 {len(bounds)} 个升序边界")
+            self._industry_row[ind] = len(rows)
+            rows.append(b)
+        self.bound_matrix = np.vstack(rows)
+        self.labels = np.array([g["name"] for g in self.grades] + ["—"], dtype=object)
+
+        self._exclude = _compile_conditions(spec.get("exclude", exclude), f"{name}.exclude")
+        self._flags = _compile_conditions(spec.get("flags", flags), f"{name}.flags")
+
+    @property
+    def bounds(self) -> np.ndarray:
+        return self.bound_matrix[0]
+
+    def grade_info(self, code: int) -> dict:
+        return self.grades[code] if code != NO_GRADE else None
+
+    def evaluate(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """frame 需含 pe、roe（百分数），可选 eps、pr、industry；返回同索引的结果表"""
+        n = len(frame)
+        pe = _finite(frame["pe"])
+        roe = _finite(frame["roe"])
+        cols = {"pe": pe, "roe": roe}
+        if "eps" in frame:
+            cols["eps"] = _finite(frame["eps"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pr = _finite(frame["pr"]) if "pr" in frame else pe / roe
+        cols["pr"] = pr
+
+        excluded, ex_reason = _eval_conditions(self._exclude, cols, n)
+        flagged, fl_reason = _eval_conditions(self._flags, cols, n)
+        pr = np.where(excluded | ~np.isfinite(pr), np.nan, pr)
+
+        if self._industry_row and "industry" in frame:
+            rows = frame["industry"].map(self._industry_row).fillna(0).to_numpy(np.intp)
+            b = self.bound_matrix[rows]
+        else:
+            b = self.bound_matrix[:1]
+        with np.errstate(invalid="ignore"):
+            above = pr[:, None] > b if self.closed == "right" else pr[:, None] >= b
+        code = above.sum(axis=1).astype(np.int8)
+        code[np.isnan(pr)] = NO_GRADE
+
+        return pd.DataFrame({
+            "pr": pr,
+            "grade_code": code,
+            "grade": self.labels[code],
+            "excluded": excluded,
+            "exclude_reason": ex_reason,
+            "flagged": flagged,
+            "flag_reason": fl_reason,
+        }, index=frame.index)
+
+
+def load_rules(path=RULES_FILE) -> dict:
+    """读取并编译全部规则，返回 {名称: RuleSet}；首个为 default 指定的那套"""
+    try:
+        cfg = json.loads(Path(path).read_text(encoding="utf-8"))
+    except ValueError as e:
+        raise RuleError(f"{path} 不是合法 JSON: {e}") from None
+    exclude, flags = cfg.get("exclude", []), cfg.get("flags", [])
+    specs = cfg.get("rulesets") or {}
+    if not specs:
+        raise RuleError(f"{path} 中没有 rulesets")
+    default = cfg.get("default", next(iter(specs)))
+    order = [default] + [k for k in specs if k != default]
+    try:
+        return {k: RuleSet(k, specs[k], exclude, flags) for k in order}
+    except KeyError as e:
+        raise RuleError(f"规则缺少字段 {e}") from None
+
+
+# ------- 输入适配 -------
+def spot_frame(spot: pd.DataFrame) -> pd.DataFrame:
+    """stock_zh_a_spot_em 行情 -> 引擎输入；ROE 由 PB / PE 隐含，EPS 由 价格 / PE 推得"""
+    pe = pd.to_numeric(spot["市盈率-动态"], errors="coerce")
+    pb = pd.to_numeric(spot["市净率"], errors="coerce")
+    price = pd.to_numeric(spot["最新价"], errors="coerce") if "最新价" in spot else None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame = pd.DataFrame({"pe": pe, "roe": pb / pe * 100}, index=spot.index)
+        # 行情里没有 EPS；价格为正时其符号与 PE 相同，亏损股因此被 EPS ≤ 0 排除
+        frame["eps"] = price / pe if price is not None else pe
+    frame = frame.replace([np.inf, -np.inf], np.nan)  # PE = 0 时除出来的 inf 视为缺失
+    if "行业" in spot:
+        frame["industry"] = spot["行业"]
+    return frame
+
+
+def year_frame(table: pd.DataFrame) -> pd.DataFrame:
+    """市赚率年表（EPS_Y、ROE_Y%、P_Y，可选 行业）-> 引擎输入"""
+    eps = pd.to_numeric(table["EPS_Y"], errors="coerce")
+    price = pd.to_numeric(table["P_Y"], errors="coerce")
+    frame = pd.DataFrame({"eps": eps, "roe": pd.to_numeric(table["ROE_Y%"], errors="coerce")},
+                         index=table.index)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame["pe"] = price / eps
+    frame = frame.replace([np.inf, -np.inf], np.nan)
+    if "行业" in table:
+        frame["industry"] = table["行业"]
+    return frame
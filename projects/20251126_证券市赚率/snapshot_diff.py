@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+市赚率快照对比
+- 每次 stock_zh_a_spot_em 刷新后，只保留计算列（PR、隐含 ROE、各套规则的档位）的紧凑数组
+- 档位由 grading.py 的规则集求值，阈值见 grading_rules.json
+- 相邻两次快照按「代码」做一次向量化连接，找出跨越档位的股票与 PR 变动最大的股票
+- 最多保留 KEEP_SNAPSHOTS 次快照、MAX_ALERTS 条提醒，内存有上限
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from grading import load_rules, spot_frame
+
+KEEP_SNAPSHOTS = 5
+MAX_ALERTS = 200
+
+
+class Snapshot:
+    """一次行情刷新的计算列；按代码排序，便于连接。grades: {规则简称: 档位编号数组}"""
+
+    __slots__ = ("taken_at", "codes", "names", "pr", "roe", "grades")
+
+    def __init__(self, spot: pd.DataFrame, rulesets: list, taken_at: float = None):
+        df = spot.drop_duplicates("代码").sort_values("代码")
+        frame = spot_frame(df)
+        results = [rs.evaluate(frame) for rs in rulesets]
+
+        self.taken_at = taken_at or time.time()
+        self.codes = df["代码"].astype(str).to_numpy(dtype="U6")
+        self.names = df["名称"].astype(str).to_numpy(dtype=object)
+        self.pr = results[0]["pr"].to_numpy(np.float32)
+        self.roe = frame["roe"].to_numpy(np.float32)
+        self.grades = {rs.short: res["grade_code"].to_numpy() for rs, res in zip(rulesets, results)}
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def diff(old: Snapshot, new: Snapshot, rulesets: list) -> pd.DataFrame:
+    """两次快照都有的股票，带新旧 PR 与各规则档位；代码已排序，一次 intersect1d 完成连接"""
+    _, io, inew = np.intersect1d(old.codes, new.codes, assume_unique=True, return_indices=True)
+    pr_old, pr_new = old.pr[io], new.pr[inew]
+    cols = {
+        "代码": new.codes[inew],
+        "名称": new.names[inew],
+        "PR_旧": pr_old,
+        "PR_新": pr_new,
+        "ΔPR": pr_new - pr_old,
+    }
+    for rs in rulesets:
+        g_old, g_new = old.grades[rs.short][io], new.grades[rs.short][inew]
+        cols[f"{rs.short}_旧"] = rs.labels[g_old]
+        cols[f"{rs.short}_新"] = rs.labels[g_new]
+        cols[f"_{rs.short}变动"] = g_old != g_new
+    return pd.DataFrame(cols)
+
+
+def transitions(joined: pd.DataFrame) -> pd.DataFrame:
+    """跨越任一档位边界的股票，按 |ΔPR| 从大到小"""
+    flags = [c for c in joined.columns if c.startswith("_") and c.endswith("变动")]
+    mask = joined[flags].any(axis=1) if flags else pd.Series(False, index=joined.index)
+    out = joined[mask]
+    return out.reindex(out["ΔPR"].abs().sort_values(ascending=False, na_position="last").index)
+
+
+def top_movers(joined: pd.DataFrame, k: int = 20) -> pd.DataFrame:
+    """|ΔPR| 最大的 k 只（两次都有有效 PR）"""
+    moved = joined[joined["ΔPR"].notna()]
+    return moved.loc[moved["ΔPR"].abs().nlargest(k).index]
+
+
+class SnapshotStore:
+    """保留最近若干次快照与档位变动提醒，线程安全（Streamlit 多会话共用）"""
+
+    def __init__(self, rulesets: list = None, keep: int = KEEP_SNAPSHOTS, max_alerts: int = MAX_ALERTS):
+        self.rulesets = list(rulesets or load_rules().values())
+        self._snaps = deque(maxlen=keep)
+        self._alerts = deque(maxlen=max_alerts)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snaps)
+
+    def push(self, spot: pd.DataFrame, taken_at: float = None) -> pd.DataFrame:
+        """记录一次刷新，返回与上一次相比的档位变动（首次为空表）"""
+        snap = Snapshot(spot, self.rulesets, taken_at)
+        with self._lock:
+            prev = self._snaps[-1] if self._snaps else None
+            self._snaps.append(snap)
+        if prev is None:
+            return pd.DataFrame()
+        moved = transitions(diff(prev, snap, self.rulesets))
+        stamp = time.strftime("%m-%d %H:%M:%S", time.localtime(snap.taken_at))
+        # 最新的提醒排在最前；同一批内 |ΔPR| 大的在前
+        with self._lock:
+            for rec in reversed(moved.to_dict("records")):
+                alert = {"时间": stamp, "代码": rec["代码"], "名称": rec["名称"],
+                         "类型": "/".join(rs.short for rs in self.rulesets if rec[f"_{rs.short}变动"])}
+                for rs in self.rulesets:
+                    alert[rs.short] = f"{rec[f'{rs.short}_旧']} → {rec[f'{rs.short}_新']}"
+                alert["PR_旧"], alert["PR_新"] = rec["PR_旧"], rec["PR_新"]
+                self._alerts.appendleft(alert)
+        return moved
+
+    def latest_pair(self):
+        with self._lock:
+            if len(self._snaps) < 2:
+                return None
+            return self._snaps[-2], self._snaps[-1]
+
+    def latest_diff(self) -> pd.DataFrame:
+        pair = self.latest_pair()
+        return diff(*pair, self.rulesets) if pair else pd.DataFrame()
+
+    def alerts(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.DataFrame(list(self._alerts))
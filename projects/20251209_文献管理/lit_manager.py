@@ -1,7 +1,15 @@
 import streamlit as st
 import pandas as pd
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
+
+# ProjectLab 根目录，引入共用的 lab_perf 耗时统计；每次 rerun 都会执行到这里，只插入一次
+LAB_ROOT = str(Path(__file__).resolve().parents[2])
+if LAB_ROOT not in sys.path:
+    sys.path.insert(0, LAB_ROOT)
+import lab_perf
 
 # ================= 配置区 =================
 # 依然建议使用绝对路径，防止找不到文件
@@ -86,7 +94,8 @@ st.markdown("""
 # ================= 主程序 =================
 
 def main():
-    df = load_data()
+    with lab_perf.span("load"):
+        df = load_data()
 
     # --- 侧边栏：录入 ---
     with st.sidebar:
@@ -156,46 +165,49 @@ def main():
         search_txt = col_search.text_input("🔍 搜索标题或标签")
         filter_src = col_filter.multiselect("来源筛选", df['source'].unique() if not df.empty else [])
         
-        view_df = df.copy()
-        if search_txt:
-            view_df = view_df[view_df['title'].str.contains(search_txt, case=False, na=False) | 
-                              view_df['tags'].str.contains(search_txt, case=False, na=False)]
-        if filter_src:
-            view_df = view_df[view_df['source'].isin(filter_src)]
+        with lab_perf.span("compute"):
+            view_df = df.copy()
+            if search_txt:
+                view_df = view_df[view_df['title'].str.contains(search_txt, case=False, na=False) | 
+                                  view_df['tags'].str.contains(search_txt, case=False, na=False)]
+            if filter_src:
+                view_df = view_df[view_df['source'].isin(filter_src)]
 
         if view_df.empty:
             st.info("没有找到相关文献。")
         else:
-            # 遍历显示
-            for idx, row in view_df.iterrows():
-                # --- 标题栏逻辑 (日期 + 标题) ---
-                try:
-                    d_str = row['date'].replace("-", "") # 20251209
-                except: d_str = "00000000"
+            with lab_perf.span("render"):
+                # 遍历显示
+                for idx, row in view_df.iterrows():
+                    # --- 标题栏逻辑 (日期 + 标题) ---
+                    try:
+                        d_str = row['date'].replace("-", "") # 20251209
+                    except: d_str = "00000000"
                 
-                # 这一行决定了不点开时看什么：【20251209】 标题
-                expander_label = f"【{d_str}】 {row['title']}"
+                    # 这一行决定了不点开时看什么：【20251209】 标题
+                    expander_label = f"【{d_str}】 {row['title']}"
                 
-                # --- 展开后的内容 (二级菜单) ---
-                with st.expander(expander_label):
-                    # 1. 标签行 (处理成小气泡)
-                    if pd.notna(row['tags']) and row['tags']:
-                        tags_html = "".join([f'<span class="tag-badge">{t.strip()}</span>' for t in row['tags'].split(",") if t.strip()])
-                        st.markdown(f"**🏷️ 标签：** {tags_html}", unsafe_allow_html=True)
+                    # --- 展开后的内容 (二级菜单) ---
+                    with st.expander(expander_label):
+                        # 1. 标签行 (处理成小气泡)
+                        if pd.notna(row['tags']) and row['tags']:
+                            tags_html = "".join([f'<span class="tag-badge">{t.strip()}</span>' for t in row['tags'].split(",") if t.strip()])
+                            st.markdown(f"**🏷️ 标签：** {tags_html}", unsafe_allow_html=True)
                     
-                    # 2. 来源与分类
-                    st.caption(f"📌 来源: {row['source']} | 分类: {row['category']}")
+                        # 2. 来源与分类
+                        st.caption(f"📌 来源: {row['source']} | 分类: {row['category']}")
                     
-                    # 3. 摘要 (重点显示区域)
-                    if pd.notna(row.get('abstract')) and row['abstract']:
-                        st.markdown(f"**📝 摘要/笔记：**")
-                        st.info(row['abstract']) # 用蓝色框框展示摘要，很醒目
-                    else:
-                        st.caption("（暂无摘要）")
+                        # 3. 摘要 (重点显示区域)
+                        if pd.notna(row.get('abstract')) and row['abstract']:
+                            st.markdown(f"**📝 摘要/笔记：**")
+                            st.info(row['abstract']) # 用蓝色框框展示摘要，很醒目
+                        else:
+                            st.caption("（暂无摘要）")
                     
-                    # 4. 链接按钮
-                    if pd.notna(row['link']) and row['link']:
-                        st.link_button("🔗 阅读原文 / 打开文件", row['link'])
+                        # 4. 链接按钮
+                        if pd.notna(row['link']) and row['link']:
+                            st.link_button("🔗 阅读原文 / 打开文件", row['link'])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with lab_perf.rerun("lit_manager"):
+        main()
\ No newline at end of file